@@ -1,10 +1,21 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import plotly.express as px
-from io import BytesIO
+import plotly.graph_objects as go
+
+from src.data_processing import (
+    PLOT_MAX_UNIQUE,
+    PLOT_MIN_UNIQUE,
+    correlation_matrix,
+    date_trends,
+    detect_columns,
+    file_digest,
+    histogram_bins,
+    load_excel,
+    load_header,
+    numeric_kpis,
+    top_values,
+)
+from src.data_export import ARROW_ERRORS, to_csv_bytes, to_parquet_bytes, to_xlsx_bytes
 
 # -------------------------------
 # Page config
@@ -52,25 +63,38 @@ if not uploaded_file:
     st.info("📂 Please upload an Excel file to analyze.")
     st.stop()
 
-df = pd.read_excel(uploaded_file)
+file_bytes = uploaded_file.getvalue()
+# Hash each upload once; widget reruns find its digest again through the uploader's file_id
+if st.session_state.get("file_id") != uploaded_file.file_id:
+    st.session_state.update(file_id=uploaded_file.file_id, file_key=file_digest(file_bytes))
+file_key = st.session_state.file_key
+
+# -------------------------------
+# Preview mode
+# -------------------------------
+st.sidebar.subheader("⚡ Preview Mode")
+preview_rows = st.sidebar.number_input("Preview rows (0 = all)", min_value=0, value=0, step=100)
+preview_cols = st.sidebar.multiselect("Columns to load (empty = all)", load_header(file_key, file_bytes, uploaded_file.name))
+
+# Identifies this exact frame (file + preview options) for the downstream caches
+frame_key = (file_key, preview_rows, tuple(preview_cols))
+
+# Keep the parsed frame and its column roles in the session: widget reruns reuse the
+# same objects instead of unpickling a fresh copy from st.cache_data every time.
+if st.session_state.get("frame_key") != frame_key:
+    df = load_excel(file_key, file_bytes, uploaded_file.name, nrows=preview_rows or None, usecols=preview_cols or None)
+    st.session_state.update(frame_key=frame_key, df=df, columns=detect_columns(frame_key, df))
+df = st.session_state.df
 st.write(f"Uploaded `{uploaded_file.name}`: Rows = {df.shape[0]}, Columns = {df.shape[1]}")
 
 # -------------------------------
 # Auto-detect columns
 # -------------------------------
-numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
-date_cols = df.select_dtypes(include='datetime').columns.tolist()
-categorical_cols = df.select_dtypes(include='object').columns.tolist()
-id_cols = [c for c in df.columns if c not in numeric_cols + categorical_cols + date_cols]
-
-# Try to parse any object column as date
-for col in df.columns:
-    if col not in numeric_cols + date_cols:
-        try:
-            df[col] = pd.to_datetime(df[col])
-            date_cols.append(col)
-        except:
-            continue
+columns = st.session_state.columns
+numeric_cols = columns["numeric"]
+categorical_cols = columns["categorical"]
+date_cols = columns["date"]
+id_cols = columns["id"]
 
 st.subheader("🔍 Detected Columns")
 st.markdown(f"**Numeric:** {numeric_cols if numeric_cols else 'None'}")
@@ -83,7 +107,7 @@ st.markdown(f"**ID / Name:** {id_cols if id_cols else 'None'}")
 # -------------------------------
 st.subheader("📊 KPIs for Numeric Columns")
 if numeric_cols:
-    kpi_df = df[numeric_cols].describe().T
+    kpi_df = numeric_kpis(frame_key, df, numeric_cols)
     st.dataframe(kpi_df)
 else:
     st.info("No numeric columns detected for KPIs.")
@@ -92,33 +116,44 @@ else:
 # Categorical counts & top values
 # -------------------------------
 st.subheader("📈 Categorical Value Counts")
-for col in categorical_cols[:5]:  # limit to first 5 columns
-    counts = df[col].value_counts().head(10)
-    st.markdown(f"**{col} - Top Values**")
-    st.bar_chart(counts)
+# ID / free-text columns with too many distinct values make useless (and slow) charts
+cardinality = columns["cardinality"]
+plottable_cols = [c for c in categorical_cols if PLOT_MIN_UNIQUE <= cardinality[c] <= PLOT_MAX_UNIQUE]
+skipped_cols = [c for c in categorical_cols if c not in plottable_cols]
+if skipped_cols:
+    st.caption("Skipped: " + ", ".join(f"{c} ({cardinality[c]} unique values)" for c in skipped_cols))
+if plottable_cols:
+    counts = top_values(frame_key, df, plottable_cols[:5])  # limit to first 5 columns
+    fig = px.bar(counts, x="value", y="count", facet_col="column", facet_col_wrap=3, title="Top Values")
+    fig.update_xaxes(matches=None, title=None)
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split("=", 1)[-1]))
+    st.plotly_chart(fig, use_container_width=True)
 
 # -------------------------------
 # Heatmaps
 # -------------------------------
 if numeric_cols:
     st.subheader("🔥 Numeric Correlation Heatmap")
-    corr = df[numeric_cols].corr()
-    plt.figure(figsize=(10,6))
-    sns.heatmap(corr, annot=True, cmap="coolwarm", fmt=".2f")
-    st.pyplot(plt.gcf())
+    corr = correlation_matrix(frame_key, df, numeric_cols)
+    fig = px.imshow(corr, text_auto=".2f", color_continuous_scale="RdBu_r", zmin=-1, zmax=1, aspect="auto")
+    st.plotly_chart(fig, use_container_width=True)
 
 # -------------------------------
 # Distribution plots for numeric
 # -------------------------------
 if numeric_cols:
     st.subheader("📊 Numeric Distributions")
-    for col in numeric_cols:
-        fig, ax = plt.subplots()
-        sns.histplot(df[col].dropna(), kde=True, color="#00d4ff")
-        ax.set_title(f"{col} Distribution", color="white")
-        ax.set_facecolor("#1e2a40")
-        fig.patch.set_facecolor('#0f1b2b')
-        st.pyplot(fig)
+    # Bins are computed server-side, so the figure carries 50 bars per column, not every value
+    bins = histogram_bins(frame_key, df, numeric_cols)
+    facet_rows = -(-len(numeric_cols) // 3)
+    fig = px.bar(bins, x="value", y="count", facet_col="column", facet_col_wrap=3,
+                 facet_row_spacing=min(0.08, 0.5 / max(facet_rows - 1, 1)), height=280 * facet_rows,
+                 color_discrete_sequence=["#00d4ff"])
+    fig.update_xaxes(matches=None, showticklabels=True, title=None)
+    fig.update_yaxes(matches=None, showticklabels=True)
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split("=", 1)[-1]))
+    fig.update_layout(bargap=0, plot_bgcolor="#1e2a40", paper_bgcolor="#0f1b2b", font_color="white")
+    st.plotly_chart(fig, use_container_width=True)
 
 # -------------------------------
 # Trend analysis for date columns
@@ -126,17 +161,29 @@ if numeric_cols:
 if date_cols and numeric_cols:
     st.subheader("📈 Trends Over Time")
     for date_col in date_cols[:3]:  # limit to 3 date columns
-        for num_col in numeric_cols[:3]:  # limit to 3 numeric columns
-            trend_df = df.groupby(date_col)[num_col].sum().reset_index()
-            fig = px.line(trend_df, x=date_col, y=num_col, title=f"{num_col} Trend over {date_col}")
+        trends = date_trends(frame_key, df, date_col, numeric_cols[:3])  # limit to 3 numeric columns
+        for num_col, (dates, sums) in trends.items():
+            # The series are plain arrays already, so skip px's DataFrame build and validation
+            fig = go.Figure(go.Scatter(x=dates, y=sums, mode="lines"))
+            fig.update_layout(title=f"{num_col} Trend over {date_col}", xaxis_title=date_col, yaxis_title=num_col)
             st.plotly_chart(fig, use_container_width=True)
 
 # -------------------------------
-# Download processed Excel
-# -------------------------------
-st.subheader("📥 Download Processed Excel")
-output = BytesIO()
-with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-    df.to_excel(writer, index=False, sheet_name='Processed_Data')
-st.download_button("Download Excel", output.getvalue(), f"{uploaded_file.name.split('.')[0]}_processed.xlsx")
+# Download processed data
+# -------------------------------
+st.subheader("📥 Download Processed Data")
+base_name = uploaded_file.name.split('.')[0]
+download_format = st.radio("Download format", ["csv", "parquet", "xlsx"], horizontal=True)
+if download_format == "parquet":
+    try:
+        parquet_bytes = to_parquet_bytes(frame_key, df)
+    except ARROW_ERRORS as e:
+        st.warning(f"Parquet export failed ({e}); offering CSV instead.")
+        download_format = "csv"
+    else:
+        st.download_button("Download Parquet", parquet_bytes, f"{base_name}_processed.parquet")
+if download_format == "csv":
+    st.download_button("Download CSV", to_csv_bytes(frame_key, df), f"{base_name}_processed.csv", mime="text/csv")
+elif download_format == "xlsx":
+    st.download_button("Download Excel", to_xlsx_bytes(frame_key, df, 'Processed_Data'), f"{base_name}_processed.xlsx")
 
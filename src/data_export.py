@@ -0,0 +1,55 @@
+# src/data_export.py
+from io import BytesIO
+
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+import xlsxwriter
+
+from src.data_processing import CACHE_MAX_ENTRIES, CACHE_TTL
+
+# What pyarrow raises for columns it cannot type, e.g. an object column mixing ints and text
+ARROW_ERRORS = (pa.ArrowTypeError, pa.ArrowInvalid)
+
+def mixes_types(s):
+    """True for object columns, or categoricals with categories, that mix numbers and text"""
+    values = s.cat.categories if isinstance(s.dtype, pd.CategoricalDtype) else s
+    if values.dtype != object:
+        return False
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    # ints and floats together still convert to a double column
+    return kind.startswith("mixed") and kind != "mixed-integer-float"
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def to_xlsx_bytes(frame_key, _df, sheet_name):
+    """Write df to an xlsx workbook row by row in xlsxwriter's constant_memory mode"""
+    output = BytesIO()
+    workbook = xlsxwriter.Workbook(output, {
+        "constant_memory": True,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+        "remove_timezone": True,
+    })
+    worksheet = workbook.add_worksheet(sheet_name)
+    worksheet.write_row(0, 0, [str(c) for c in _df.columns])
+    # constant_memory only keeps the current row, so cells must be written row-major
+    values = _df.astype(object).where(_df.notna(), None)
+    for row_idx, row in enumerate(values.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(row_idx, 0, row)
+    workbook.close()
+    return output.getvalue()
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def to_parquet_bytes(frame_key, _df):
+    """Column-chunked binary export (zstd); keeps dtypes and skips per-cell stringification"""
+    output = BytesIO()
+    # Columns that still mix types (e.g. ref numbers with [1, 'A2', 3]) are written as text
+    mixed = [col for col in _df.columns if mixes_types(_df[col])]
+    _df.astype({col: "string" for col in mixed}).to_parquet(output, engine="pyarrow", index=False, compression="zstd")
+    return output.getvalue()
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def to_csv_bytes(frame_key, _df):
+    """UTF-8 CSV export, encoded straight into the buffer instead of via one big str"""
+    output = BytesIO()
+    _df.to_csv(output, index=False, encoding="utf-8")
+    return output.getvalue()
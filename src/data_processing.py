@@ -1,25 +1,358 @@
 # src/data_processing.py
+import datetime
+import hashlib
+import importlib.util
+import os
+import re
+import tempfile
+import warnings
+
+import numpy as np
 import pandas as pd
+import streamlit as st
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+NAME_ID_SUFFIX = re.compile(r'[\s_-]*\d+$')
 
 def clean_name(data, col):
     """Remove IDs from names"""
     if col in data.columns:
-        return data[col].astype(str).str.replace(r'[\s_-]*\d+$', '', regex=True).str.strip()
+        # Names repeat, so strip each distinct value once and broadcast back through the codes
+        codes, uniques = pd.factorize(data[col].astype(str), use_na_sentinel=False)
+        cleaned = pd.Index(uniques).str.replace(NAME_ID_SUFFIX, '', regex=True).str.strip()
+        return pd.Series(cleaned.take(codes), index=data.index, name=col)
     return None
 
+def as_datetime(s):
+    """Datetime view of s; columns already parsed at load time are returned as-is"""
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    return pd.to_datetime(s, errors='coerce', cache=True)
+
+def flag(s, values):
+    """int8 1/0 flag for cells whose lower-cased text is in values"""
+    return s.astype("string").str.lower().isin(values).astype(np.int8)
+
 def compute_kpis(data):
     """Add KPI columns"""
-    data['Done Tasks'] = data['Status'].apply(lambda x: 1 if str(x).lower() in ['done', 'closed'] else 0) if 'Status' in data.columns else 0
-    data['Pending Tasks'] = data['Status'].apply(lambda x: 1 if str(x).lower() not in ['done', 'closed'] else 0) if 'Status' in data.columns else 0
-    data['SLA TTO Done'] = data['SLA tto passed'].apply(lambda x: 1 if str(x).lower() == 'yes' else 0) if 'SLA tto passed' in data.columns else 0
-    data['SLA TTO Violations'] = data['SLA tto over'].apply(lambda x: 1 if str(x).lower() == 'yes' else 0) if 'SLA tto over' in data.columns else 0
-    data['SLA TTR Done'] = data['SLA ttr passed'].apply(lambda x: 1 if str(x).lower() == 'yes' else 0) if 'SLA ttr passed' in data.columns else 0
-    data['SLA TTR Violations'] = data['SLA ttr over'].apply(lambda x: 1 if str(x).lower() == 'yes' else 0) if 'SLA ttr over' in data.columns else 0
+    if 'Status' in data.columns:
+        data['Done Tasks'] = flag(data['Status'], {'done', 'closed'})
+        data['Pending Tasks'] = 1 - data['Done Tasks']
+    else:
+        data['Done Tasks'] = data['Pending Tasks'] = 0
+    data['SLA TTO Done'] = flag(data['SLA tto passed'], {'yes'}) if 'SLA tto passed' in data.columns else 0
+    data['SLA TTO Violations'] = flag(data['SLA tto over'], {'yes'}) if 'SLA tto over' in data.columns else 0
+    data['SLA TTR Done'] = flag(data['SLA ttr passed'], {'yes'}) if 'SLA ttr passed' in data.columns else 0
+    data['SLA TTR Violations'] = flag(data['SLA ttr over'], {'yes'}) if 'SLA ttr over' in data.columns else 0
 
     if 'Closed date' in data.columns and 'Start date' in data.columns:
-        data['Closed date'] = pd.to_datetime(data['Closed date'], errors='coerce')
-        data['Start date'] = pd.to_datetime(data['Start date'], errors='coerce')
+        data['Closed date'] = as_datetime(data['Closed date'])
+        data['Start date'] = as_datetime(data['Start date'])
         data['Duration (days)'] = (data['Closed date'] - data['Start date']).dt.days
     else:
         data['Duration (days)'] = None
     return data
+
+# Rust-based reader, much faster than openpyxl on large sheets (pandas >= 2.2)
+HAS_CALAMINE = (
+    importlib.util.find_spec("python_calamine") is not None
+    and tuple(int(p) for p in pd.__version__.split(".")[:2]) >= (2, 2)
+)
+DATE_PROBE_ROWS = 1000  # only the head of a column is parsed to decide whether it holds dates
+DATE_PROBE_MIN_SHARE = 0.9
+CATEGORY_MAX_RATIO = 0.5  # convert text columns with fewer unique values than this share of rows
+NUMBA_MIN_CELLS = 1_000_000  # below this the JIT warm-up costs more than it saves
+KPI_STATS = ["count", "sum", "mean", "std", "min", "max"]
+# Whole-word ID keywords in a column name, e.g. 'Emp_ID' or 'User Name' but not 'Paid'
+ID_NAME_PATTERN = re.compile(r"(?:^|[^a-z0-9])(?:id|name|ref|user)(?:$|[^a-z0-9])")
+TREND_MAX_POINTS = 2000  # longer trend lines are LTTB-downsampled before plotting
+PLOT_MIN_UNIQUE, PLOT_MAX_UNIQUE = 2, 50  # value-count charts only for columns in this range
+# Per-frame caches are shared by every session; bound them so old uploads and preview steps expire
+CACHE_MAX_ENTRIES = 8
+CACHE_TTL = "1h"
+
+def is_text(dtype):
+    """True for object / string dtypes (plain text, not yet categorical)"""
+    return pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)
+
+def date_cells(s):
+    """s with every cell that is not date text or a date value (e.g. numbers) blanked out"""
+    if not pd.api.types.is_object_dtype(s.dtype):
+        return s
+    # to_datetime would read a number as nanoseconds since 1970, so numbers never count as dates
+    return s.where(s.map(lambda v: isinstance(v, (str, datetime.date, np.datetime64))))
+
+def looks_like_date(s):
+    """Cheap probe on the first non-null values before paying for a full parse"""
+    sample = s.iloc[:DATE_PROBE_ROWS].dropna()
+    if sample.empty:
+        # leading blanks: fall back to the first non-null values anywhere in the column
+        sample = s.dropna().head(DATE_PROBE_ROWS)
+    if sample.empty:
+        return False
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        parsed = pd.to_datetime(date_cells(sample), errors="coerce", format="mixed")
+    return parsed.notna().mean() > DATE_PROBE_MIN_SHARE
+
+# The normalisers below rewrite entries of a {name: Series} dict; load_excel builds the
+# frame from it once, instead of fragmenting it with one df[col] = ... per converted column.
+def parse_dates(columns):
+    """Convert date-like text columns to datetime once, right after load"""
+    for col, s in columns.items():
+        if is_text(s.dtype) and looks_like_date(s):
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                columns[col] = pd.to_datetime(date_cells(s), errors="coerce", format="mixed", cache=True)
+    return columns
+
+def downcast_numeric(columns):
+    """Shrink int64/float64 columns to the smallest dtype that holds their values exactly"""
+    for col, s in columns.items():
+        if pd.api.types.is_integer_dtype(s.dtype):
+            columns[col] = pd.to_numeric(s, downcast="integer")
+        elif s.dtype == np.float64:
+            # downcast="float" tolerates rounding (1.1 -> 1.100000023841858); keep float64 unless lossless
+            narrow = s.astype(np.float32)
+            if narrow.astype(np.float64).equals(s):
+                columns[col] = narrow
+    return columns
+
+def to_categories(columns):
+    """Store repetitive text columns as categoricals and the rest as Arrow strings"""
+    for col, s in columns.items():
+        if is_text(s.dtype):
+            # one hash pass gives both the cardinality and the category codes
+            codes, uniques = pd.factorize(s)
+            if len(uniques) <= CATEGORY_MAX_RATIO * len(s):
+                columns[col] = pd.Series(pd.Categorical.from_codes(codes, categories=uniques), index=s.index, name=col)
+            # Arrow-backed strings avoid one boxed Python object per cell
+            elif pd.api.types.is_object_dtype(s) and pd.api.types.infer_dtype(s, skipna=True) == "string":
+                columns[col] = s.astype("string[pyarrow]")
+    return columns
+
+def read_excel(file_bytes, file_name, **kwargs):
+    """pd.read_excel on raw upload bytes, picking the engine from the file suffix"""
+    # Hand the reader a real file so the OS pages it in, instead of a second in-RAM buffer
+    suffix = os.path.splitext(file_name)[1].lower()
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        tmp.write(file_bytes)
+    try:
+        if HAS_CALAMINE:
+            return pd.read_excel(tmp.name, engine="calamine", **kwargs)
+        if suffix == ".xls":
+            return pd.read_excel(tmp.name, engine="xlrd", **kwargs)
+        return pd.read_excel(
+            tmp.name,
+            engine="openpyxl",
+            engine_kwargs={"read_only": True, "data_only": True},
+            **kwargs,
+        )
+    finally:
+        os.unlink(tmp.name)
+
+def file_digest(file_bytes):
+    """Short content hash of an upload, used as the cache key instead of the raw bytes"""
+    return hashlib.blake2b(file_bytes, digest_size=16).hexdigest()
+
+# Cached helpers below take a precomputed key; leading-underscore arguments
+# (raw bytes, DataFrames) are skipped by st.cache_data's hashing.
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def load_header(file_key, _file_bytes, file_name):
+    """Column names only, without parsing any data rows"""
+    return read_excel(_file_bytes, file_name, nrows=0).columns.tolist()
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def load_excel(file_key, _file_bytes, file_name, nrows=None, usecols=None):
+    """Read an uploaded workbook (optionally just the first rows / some columns)"""
+    if usecols is not None:
+        # Match by header name: a list of int headers (e.g. years) would be read as positions
+        usecols = lambda col, keep=frozenset(usecols): col in keep
+    df = read_excel(_file_bytes, file_name, nrows=nrows, usecols=usecols)
+    columns = to_categories(parse_dates(downcast_numeric({col: df[col] for col in df.columns})))
+    return pd.DataFrame(columns, index=df.index)
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def detect_columns(frame_key, _df):
+    """Split columns into numeric, categorical, date and ID roles from their dtypes"""
+    dtypes = _df.dtypes
+    is_numeric = dtypes.map(lambda t: pd.api.types.is_numeric_dtype(t) and not pd.api.types.is_bool_dtype(t))
+    is_date = dtypes.map(pd.api.types.is_datetime64_any_dtype)
+    is_categorical = dtypes.map(lambda t: is_text(t) or isinstance(t, pd.CategoricalDtype))
+    # Text that stayed high-cardinality and is named like an identifier is an ID, not a category
+    id_named = dtypes.index.astype(str).str.lower().str.contains(ID_NAME_PATTERN)
+    is_categorical &= ~(dtypes.map(is_text) & id_named)
+    categorical_cols = dtypes.index[is_categorical].tolist()
+    return {
+        "numeric": dtypes.index[is_numeric].tolist(),
+        "categorical": categorical_cols,
+        "date": dtypes.index[is_date].tolist(),
+        "id": dtypes.index[~(is_numeric | is_date | is_categorical)].tolist(),
+        # categoricals already know their distinct values; only plain text needs a hash pass
+        "cardinality": {
+            col: len(_df[col].cat.categories) if isinstance(dtypes[col], pd.CategoricalDtype) else _df[col].nunique()
+            for col in categorical_cols
+        },
+    }
+
+def timestamp_groups(s):
+    """Non-null mask, sorted distinct timestamps and per-row group index of a datetime column"""
+    valid = s.notna().to_numpy()
+    dates, groups = np.unique(s.to_numpy()[valid], return_inverse=True)
+    return valid, dates, groups
+
+def lttb(x, y, n_out):
+    """Indices of the n_out points (Largest-Triangle-Three-Buckets) that best keep the line's shape"""
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # first and last points are kept; the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    edges = np.append(edges, n)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_x = x[hi:edges[i + 2]].mean()
+        next_y = y[hi:edges[i + 2]].mean()
+        # twice the area of the triangle (selected point, candidate, next bucket's mean)
+        area = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def date_trends(frame_key, _df, date_col, numeric_cols):
+    """Per-timestamp sums of each numeric column over date_col, LTTB-downsampled for plotting"""
+    valid, dates, groups = timestamp_groups(_df[date_col])
+    date_ns = pd.DatetimeIndex(dates).asi8
+    trends = {}
+    for num_col in numeric_cols:
+        values = np.nan_to_num(_df[num_col].to_numpy(dtype=np.float64, na_value=np.nan)[valid])
+        sums = np.bincount(groups, weights=values, minlength=len(dates))
+        keep = lttb(date_ns, sums, TREND_MAX_POINTS)
+        trends[num_col] = (dates[keep], sums[keep])
+    return trends
+
+if HAS_NUMBA:
+    @njit(parallel=True, cache=True)
+    def kpi_kernel(mat):
+        """count/sum/mean/std/min/max of each row of mat in a single pass, skipping NaN"""
+        k, n = mat.shape
+        out = np.full((k, 6), np.nan)
+        for j in prange(k):
+            cnt = 0
+            total = 0.0
+            mean = 0.0
+            m2 = 0.0
+            lo = np.inf
+            hi = -np.inf
+            for i in range(n):
+                v = mat[j, i]
+                if v != v:
+                    continue
+                cnt += 1
+                total += v
+                delta = v - mean
+                mean += delta / cnt
+                m2 += delta * (v - mean)
+                lo = min(lo, v)
+                hi = max(hi, v)
+            out[j, 0] = cnt
+            out[j, 1] = total
+            if cnt > 0:
+                out[j, 2] = mean
+                out[j, 4] = lo
+                out[j, 5] = hi
+            if cnt > 1:
+                out[j, 3] = np.sqrt(m2 / (cnt - 1))
+        return out
+
+@st.cache_resource(show_spinner=False, max_entries=4, ttl=CACHE_TTL)
+def numeric_matrix(frame_key, _df, numeric_cols):
+    """Numeric columns as one C-contiguous float64 array, one row per column (NaN for missing)"""
+    # cache_resource hands back the same array on every rerun instead of unpickling a copy
+    return np.ascontiguousarray(_df[numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan).T)
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def numeric_kpis(frame_key, _df, numeric_cols):
+    """Summary statistics for the numeric columns, one row per column"""
+    mat = numeric_matrix(frame_key, _df, numeric_cols)
+    if HAS_NUMBA and mat.size >= NUMBA_MIN_CELLS:
+        stats = kpi_kernel(mat)
+    else:
+        with warnings.catch_warnings(), np.errstate(invalid="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+            stats = np.column_stack([
+                np.sum(~np.isnan(mat), axis=1),
+                np.nansum(mat, axis=1),
+                np.nanmean(mat, axis=1),
+                np.nanstd(mat, axis=1, ddof=1),
+                np.nanmin(mat, axis=1),
+                np.nanmax(mat, axis=1),
+            ])
+    return pd.DataFrame(stats, index=numeric_cols, columns=KPI_STATS).astype({"count": np.int64})
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def histogram_bins(frame_key, _df, numeric_cols, bins=50):
+    """Long frame of (column, bin centre, count) for every numeric column"""
+    mat = numeric_matrix(frame_key, _df, numeric_cols)
+    parts = []
+    for col, row in zip(numeric_cols, mat):
+        values = row[~np.isnan(row)]
+        if values.size == 0:
+            continue
+        counts, edges = np.histogram(values, bins=bins)
+        parts.append(pd.DataFrame({
+            "column": col,
+            "value": (edges[:-1] + edges[1:]) / 2,
+            "count": counts,
+        }))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["column", "value", "count"])
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def top_values(frame_key, _df, categorical_cols, n=10):
+    """Long frame of (column, value, count) for the n most frequent values of each column"""
+    parts = [
+        # observed/sort=False: skip unused categories and the label sort; nlargest only ranks the top n
+        _df.groupby(col, observed=True, sort=False).size().nlargest(n)
+        .rename_axis("value").reset_index(name="count").assign(column=col)
+        for col in categorical_cols
+    ]
+    out = pd.concat(parts, ignore_index=True)
+    out["value"] = out["value"].astype(str)
+    return out
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def correlation_matrix(frame_key, _df, numeric_cols):
+    """Pairwise-complete Pearson correlation (like df.corr()) from float32 matrix products"""
+    mat = numeric_matrix(frame_key, _df, numeric_cols)
+    valid = ~np.isnan(mat)
+    # Centre in float64 before narrowing: float32 cannot resolve a small spread around a
+    # large mean (1e6 +- 0.01), but the centred residuals are safe for the float32 GEMMs
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+        x = (mat - np.nanmean(mat, axis=1, keepdims=True)).astype(np.float32)
+    x[~valid] = 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if valid.all():
+            cov = x @ x.T
+            std = np.sqrt(np.diag(cov))
+            corr = cov / np.outer(std, std)
+        else:
+            # Restrict every pair (i, j) to the rows where both columns are present
+            m = valid.astype(np.float32)
+            n = m @ m.T
+            sx = x @ m.T  # sx[i, j]: sum of column i over rows where column j is present
+            cov = x @ x.T - sx * sx.T / n
+            var = (x * x) @ m.T - sx * sx / n
+            corr = cov / np.sqrt(var * var.T)
+    return pd.DataFrame(np.clip(corr, -1, 1), index=numeric_cols, columns=numeric_cols)
@@ -15,10 +15,12 @@ def create_ppt(summary_dfs: dict):
         left, top, width, height = Inches(0.5), Inches(1.5), Inches(9), Inches(0.8)
         table = slide.shapes.add_table(rows, cols, left, top, width, height).table
 
-        for col_idx, col_name in enumerate(df.columns):
-            table.cell(0, col_idx).text = col_name
-
-        for row_idx, row in df.iterrows():
-            for col_idx, value in enumerate(row):
-                table.cell(row_idx+1, col_idx).text = str(value)
+        # Stringify up front and walk the table rows in order: table.cell(r, c)
+        # re-lists every <a:tr> on each call, and df.iterrows() boxes each row as
+        # a Series (and yields index labels, not positions)
+        texts = [[str(c) for c in df.columns]]
+        texts += [[str(v) for v in row] for row in df.itertuples(index=False, name=None)]
+        for table_row, row_texts in zip(table.rows, texts):
+            for cell, text in zip(table_row.cells, row_texts):
+                cell.text = text
     return prs
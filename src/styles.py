@@ -165,12 +165,18 @@ def set_style():
         unsafe_allow_html=True
     )
 
+@st.cache_resource(show_spinner=False)
+def load_logo(logo_path):
+    """Decoded logo image, read from disk once per process"""
+    img = Image.open(logo_path)
+    img.load()
+    return img
+
 def show_logo():
     """Display a logo from assets folder"""
     logo_path = os.path.join(os.getcwd(), "assets", "logo.png")
     try:
-        img = Image.open(logo_path)
-        st.image(img, width=150)
+        st.image(load_logo(logo_path), width=150)
     except FileNotFoundError:
         st.warning("Logo file not found in assets/logo.png")
 
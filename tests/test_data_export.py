@@ -0,0 +1,24 @@
+from io import BytesIO
+
+import pandas as pd
+
+from src.data_export import to_parquet_bytes
+from src.data_processing import to_categories
+
+
+def read_back(df):
+    return pd.read_parquet(BytesIO(to_parquet_bytes(("test", id(df)), df)))
+
+
+def test_parquet_writes_mixed_categorical_as_text():
+    s = pd.Series([1, "A"] * 1500, dtype=object, name="Mixed")
+    df = pd.DataFrame(to_categories({"Mixed": s}))
+    assert isinstance(df["Mixed"].dtype, pd.CategoricalDtype)
+    assert read_back(df)["Mixed"].tolist() == ["1", "A"] * 1500
+
+
+def test_parquet_writes_mixed_object_column_as_text():
+    df = pd.DataFrame({"Ticket": pd.Series([1, "A2", 3], dtype=object), "n": [1, 2, 3]})
+    out = read_back(df)
+    assert out["Ticket"].tolist() == ["1", "A2", "3"]
+    assert out["n"].tolist() == [1, 2, 3]
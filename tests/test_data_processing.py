@@ -0,0 +1,23 @@
+import pandas as pd
+
+from src.data_processing import parse_dates
+
+
+def test_parse_dates_keeps_every_format_of_a_mixed_date_column():
+    values = ["2024-01-%02d" % (i % 28 + 1) for i in range(95)]
+    values += ["Jan 5, 2024", "05/02/2024", "2024/03/04", "March 3 2024", "2024.01.02"]
+    out = parse_dates({"d": pd.Series(values, dtype=object)})["d"]
+    assert pd.api.types.is_datetime64_any_dtype(out)
+    assert out.notna().all()
+
+
+def test_parse_dates_leaves_numbers_with_a_placeholder_alone():
+    s = pd.Series(list(range(1, 100)) + ["-"], dtype=object)
+    assert parse_dates({"Qty": s})["Qty"] is s
+
+
+def test_parse_dates_detects_a_column_written_in_several_formats():
+    s = pd.Series(["2024-01-05", "Feb 3, 2024", "03/04/2024", "2024/05/06"] * 25, dtype=object)
+    out = parse_dates({"d": s})["d"]
+    assert pd.api.types.is_datetime64_any_dtype(out)
+    assert out.notna().all()